@@ -0,0 +1,255 @@
+import argparse
+import glob
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+
+LOG_DIR = os.path.join(os.path.expanduser('~'), '.studytools', 'events')
+SEGMENT_PREFIX = 'events'
+SEGMENT_EXT = '.bin'
+SUMMARY_NAME = 'summary.npz'
+MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+MAX_WORD_BYTES = 64
+
+EVENT_DTYPE = np.dtype([('timestamp', '<f8'),
+                        ('word', f'S{MAX_WORD_BYTES}'),
+                        ('correct', '?'),
+                        ('latency', '<f4')])
+
+SUMMARY_DTYPE = np.dtype([('word', f'S{MAX_WORD_BYTES}'),
+                          ('attempts', '<i8'),
+                          ('errors', '<i8')])
+
+PERCENTILES = (50, 90, 99)
+
+
+def difficulty(errors, attempts):
+    """Error rate smoothed towards 0.5, so words with few attempts aren't scored as all or nothing"""
+    return (errors + 1) / (attempts + 2)
+
+
+DEFAULT_DIFFICULTY = difficulty(0, 0)
+
+
+class EventLog:
+    """Append-only log of flashcard outcomes, stored as fixed-size binary records split across rotating segments.
+
+    A per-word summary of attempts and errors is kept next to the log, along with the number of events it covers. It is
+    rebuilt from the segments whenever that number doesn't match them, e.g. after a crash between the two writes. Each
+    append merges into the summary held in memory and rewrites the summary file, which costs time in the number of
+    distinct words, not events"""
+
+    def __init__(self, log_dir: str = LOG_DIR, max_segment_bytes: int = MAX_SEGMENT_BYTES):
+        self.log_dir = log_dir
+        self.max_segment_bytes = max(max_segment_bytes, EVENT_DTYPE.itemsize)
+
+        self._summary = None
+        self._summary_events = 0
+
+    def segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.log_dir, f'{SEGMENT_PREFIX}.*{SEGMENT_EXT}')))
+
+    def _segment_path(self, index: int):
+        return os.path.join(self.log_dir, f'{SEGMENT_PREFIX}.{index:06d}{SEGMENT_EXT}')
+
+    def _current_segment(self, n_bytes: int):
+        segments = self.segments()
+        if not segments:
+            return self._segment_path(0)
+
+        last = segments[-1]
+        if os.path.getsize(last) + n_bytes > self.max_segment_bytes:
+            index = int(os.path.basename(last)[len(SEGMENT_PREFIX) + 1:-len(SEGMENT_EXT)])
+            return self._segment_path(index + 1)
+
+        return last
+
+    def append(self, events: np.ndarray):
+        if not len(events):
+            return
+
+        events = events.astype(EVENT_DTYPE, copy=False)
+        summary = self.summary()
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        with open(self._current_segment(events.nbytes), 'ab') as file:
+            events.tofile(file)
+
+        self._write_summary(merge_summaries(summary, summarize(events)), self._summary_events + len(events))
+
+    def record(self, word: str, correct: bool, latency: float):
+        self.append(make_events([word], [correct], [latency]))
+
+    def read(self) -> np.ndarray:
+        segments = self.segments()
+        if not segments:
+            return np.empty(0, dtype=EVENT_DTYPE)
+
+        return np.concatenate([np.fromfile(path, dtype=EVENT_DTYPE) for path in segments])
+
+    def n_events(self) -> int:
+        return sum(os.path.getsize(path) for path in self.segments()) // EVENT_DTYPE.itemsize
+
+    def summary(self) -> np.ndarray:
+        n_events = self.n_events()
+        if self._summary is not None and self._summary_events == n_events:
+            return self._summary
+
+        path = os.path.join(self.log_dir, SUMMARY_NAME)
+        if os.path.isfile(path):
+            with np.load(path) as file:
+                if int(file['n_events']) == n_events:
+                    self._summary, self._summary_events = file['summary'], n_events
+                    return self._summary
+
+        # Missing or stale summaries are rebuilt from the segments once and the result saved
+        events = self.read()
+        summary = summarize(events)
+        if len(events):
+            self._write_summary(summary, len(events))
+        else:
+            self._summary, self._summary_events = summary, 0
+
+        return summary
+
+    def _write_summary(self, summary: np.ndarray, n_events: int):
+        tmp_path = os.path.join(self.log_dir, SUMMARY_NAME + '.tmp')
+        with open(tmp_path, 'wb') as file:
+            np.savez(file, summary=summary, n_events=n_events)
+
+        os.replace(tmp_path, os.path.join(self.log_dir, SUMMARY_NAME))
+        self._summary, self._summary_events = summary, n_events
+
+
+def make_events(words: List[str], correct: List[bool], latencies: List[float], timestamp: float = None) -> np.ndarray:
+    events = np.empty(len(words), dtype=EVENT_DTYPE)
+    events['timestamp'] = time.time() if timestamp is None else timestamp
+    events['word'] = [encode_word(word) for word in words]
+    events['correct'] = correct
+    events['latency'] = latencies
+
+    return events
+
+
+def encode_word(word: str) -> bytes:
+    return word.encode('utf-8')[:MAX_WORD_BYTES]
+
+
+def aggregate(events: np.ndarray, percentiles=PERCENTILES) -> Dict:
+    """Compute per-word attempt counts, error rates, and latency percentiles"""
+    words, inverse = np.unique(events['word'], return_inverse=True)
+    inverse = inverse.ravel()
+
+    attempts = np.bincount(inverse, minlength=len(words))
+    errors = np.bincount(inverse, weights=~events['correct'], minlength=len(words))
+
+    stats = {'word': np.array([word.decode('utf-8', errors='ignore') for word in words], dtype=object),
+             'attempts': attempts,
+             'error_rate': errors / np.maximum(attempts, 1),
+             'difficulty': difficulty(errors, attempts)}
+
+    # Sort latencies within each word group, then index into every group at once
+    order = np.lexsort((events['latency'], inverse))
+    sorted_latency = events['latency'][order].astype(np.float64)
+    starts = np.concatenate(([0], np.cumsum(attempts)[:-1]))
+    for p in percentiles:
+        pos = starts + (attempts - 1) * (p / 100)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.ceil(pos).astype(np.int64)
+        frac = pos - lo
+        stats[f'p{p}'] = sorted_latency[lo] * (1 - frac) + sorted_latency[hi] * frac
+
+    return stats
+
+
+def summarize(events: np.ndarray) -> np.ndarray:
+    words, inverse = np.unique(events['word'], return_inverse=True)
+    inverse = inverse.ravel()
+
+    summary = np.empty(len(words), dtype=SUMMARY_DTYPE)
+    summary['word'] = words
+    summary['attempts'] = np.bincount(inverse, minlength=len(words))
+    summary['errors'] = np.bincount(inverse, weights=~events['correct'], minlength=len(words))
+
+    return summary
+
+
+def merge_summaries(*summaries: np.ndarray) -> np.ndarray:
+    summary = np.concatenate(summaries)
+    words, inverse = np.unique(summary['word'], return_inverse=True)
+    inverse = inverse.ravel()
+
+    merged = np.empty(len(words), dtype=SUMMARY_DTYPE)
+    merged['word'] = words
+    merged['attempts'] = np.bincount(inverse, weights=summary['attempts'], minlength=len(words))
+    merged['errors'] = np.bincount(inverse, weights=summary['errors'], minlength=len(words))
+
+    return merged
+
+
+def difficulty_scores(summary: np.ndarray) -> Dict[str, float]:
+    words = [word.decode('utf-8', errors='ignore') for word in summary['word']]
+
+    return dict(zip(words, difficulty(summary['errors'], summary['attempts'])))
+
+
+def sample_weights(words: List[str], scores: Dict[str, float]) -> np.ndarray:
+    """Weight words by difficulty so weak words are sampled more often. Unseen words get the neutral prior of 0.5"""
+    weights = np.array([scores.get(encode_word(word).decode('utf-8', errors='ignore'), DEFAULT_DIFFICULTY)
+                        for word in words], dtype=np.float64)
+    return weights / weights.sum()
+
+
+def stats_to_str(stats: Dict, n_rows: int = None):
+    order = np.argsort(-stats['difficulty'], kind='stable')[:n_rows]
+    latency_keys = [key for key in stats if key.startswith('p') and key[1:].isdigit()]
+
+    header = ['Word', 'Attempts', 'Error rate'] + [f'{key} latency' for key in latency_keys]
+    rows = ['\t'.join(header)]
+    for i in order:
+        row = [stats['word'][i], str(stats['attempts'][i]), f'{stats["error_rate"][i] * 100:.1f}%']
+        row.extend(f'{stats[key][i]:.2f}s' for key in latency_keys)
+        rows.append('\t'.join(row))
+
+    return '\n'.join(rows)
+
+
+def validate_args(args: Dict):
+    if not os.path.isdir(args['log']):
+        raise ValueError(f'Log directory {args["log"]} does not exist')
+    if args['top'] is not None and args['top'] < 1:
+        raise ValueError('TOP must be positive')
+
+
+def get_args():
+    parser = argparse.ArgumentParser(prog='analytics',
+                                     description='Summarize per-word flashcard error rates and response latencies')
+
+    parser.add_argument('-log',
+                        metavar='LOG_DIR',
+                        type=str,
+                        required=False,
+                        default=LOG_DIR,
+                        help=f'Directory containing the event log. Defaults to {LOG_DIR}')
+
+    parser.add_argument('-top',
+                        metavar='N',
+                        type=int,
+                        required=False,
+                        help='Only show the N most difficult words')
+
+    args = vars(parser.parse_args())
+    validate_args(args)
+
+    return args
+
+
+if __name__ == '__main__':
+    args = get_args()
+    events = EventLog(args['log']).read()
+    if len(events):
+        print(stats_to_str(aggregate(events), args['top']))
+    else:
+        print('No events recorded.')
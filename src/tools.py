@@ -1,10 +1,13 @@
 import os
+import time
 from enum import Enum, auto
 from typing import List
 
 import numpy as np
+from analytics import EventLog, LOG_DIR, DEFAULT_DIFFICULTY, difficulty_scores, sample_weights
 from options import Option, MultipleChoice
-from words2dict import read_words, build_dict, write_dict, parse_dict, entry_to_str
+from words2dict import read_words, build_dict, write_dict, parse_dict, entry_to_str, is_sharded_dict, \
+    append_sharded_dict, sample_dict
 
 
 class ToolID(Enum):
@@ -30,12 +33,12 @@ class Tool:
 
 # ToDo: abstract input and backend so words can be anything that the backend can retrieve
 class VocabTool(Tool):
-    def __init__(self):
+    def __init__(self, log_dir: str = LOG_DIR):
         options = [
             Option(name='src_path',
                    prompt='What file would you like to use?\nEx. words.txt',
-                   validator=lambda path: os.path.isfile(path),
-                   msg='File does not exist'),
+                   validator=lambda path: os.path.isfile(path) or is_sharded_dict(path),
+                   msg='File or sharded dictionary does not exist'),
             Option(name='is_dict',
                    prompt='Is this a list of words, or a pregenerated dictionary file?\n1.\tWords\n2.\tDictionary',
                    validator=lambda x: x.isdigit() and (1 <= int(x) <= 2),
@@ -52,14 +55,21 @@ class VocabTool(Tool):
 
         super().__init__(options)
 
+        self._event_log = EventLog(log_dir)
+
     def run(self):
         args = self._options_prompt()
 
-        flashcards = self.__load_flashcards(path=args['src_path'], is_dict=args['is_dict'], n_words=args['n_cards'])
+        flashcards = self.__load_flashcards(path=args['src_path'],
+                                            is_dict=args['is_dict'] or is_sharded_dict(args['src_path']),
+                                            n_words=args['n_cards'])
 
         play_again = True
+        # Only the first pass is recorded, retries come right after the correct answers were shown
+        record = True
         while play_again:
-            flashcards = self.__show_flashcards(flashcards, args['show_def'])
+            flashcards = self.__show_flashcards(flashcards, args['show_def'], record)
+            record = False
             if len(flashcards):
                 play_again_option = Option(name='play_again',
                                            prompt='Would you like to play again with the words you missed?\n1.\tYes\n2.\tNo',
@@ -71,7 +81,7 @@ class VocabTool(Tool):
             else:
                 play_again = False
 
-    def __show_flashcards(self, flashcards: List[MultipleChoice], show_def: bool = False):
+    def __show_flashcards(self, flashcards: List[MultipleChoice], show_def: bool = False, record: bool = True):
         mistakes = []
 
         print('Flashcards')
@@ -80,7 +90,12 @@ class VocabTool(Tool):
             flashcard.shuffle_options()
 
             print(f'[{i + 1} / {len(flashcards)}]')
+            start = time.perf_counter()
             flashcard.prompt_user()
+            latency = time.perf_counter() - start
+            if record:
+                self._event_log.record(flashcard.entry['word'], flashcard.is_correct(), latency)
+
             if flashcard.is_correct():
                 print('Correct!\n')
             else:
@@ -100,21 +115,34 @@ class VocabTool(Tool):
         return mistakes
 
     def __load_flashcards(self, path: str, is_dict: bool, n_words: int):
+        N_OPTIONS = 4
         entries = []
         words = []
+        scores = difficulty_scores(self._event_log.summary())
 
         if is_dict:
-            entries = [entry for entry in parse_dict(path) if 'Missing definition' not in entry['definition']]
+            def has_definition(entry):
+                return 'Missing definition' not in entry['definition']
+
+            if is_sharded_dict(path):
+                # Shards holding the hardest known words are favoured so they can still be picked, the rest come from
+                # enough random shards to draw the cards and their answer options from
+                priorities = {word: score - DEFAULT_DIFFICULTY for word, score in scores.items()
+                              if score > DEFAULT_DIFFICULTY}
+                entries = sample_dict(path, N_OPTIONS * n_words, priorities=priorities, accept=has_definition)
+            else:
+                entries = [entry for entry in parse_dict(path) if has_definition(entry)]
             words = [entry['word'] for entry in entries]
 
             try:
-                entries = list(np.random.choice(entries, size=n_words, replace=False))
+                entries = list(np.random.choice(entries, size=n_words, replace=False,
+                                                p=sample_weights(words, scores)))
             except ValueError:
                 raise ValueError(f'Dictionary must contain at least {n_words} entries')
         else:
             try:
                 words = read_words(path)
-                words_subset = np.random.choice(words, size=n_words, replace=False)
+                words_subset = np.random.choice(words, size=n_words, replace=False, p=sample_weights(words, scores))
             except ValueError:
                 raise ValueError(f'File must contain at least {n_words} words')
 
@@ -133,12 +161,14 @@ class VocabTool(Tool):
                 save_path_option.prompt_user()
                 save_path = save_path_option.selection
 
-                write_dict(entries, save_path)
+                if is_sharded_dict(save_path):
+                    append_sharded_dict(entries, save_path)
+                else:
+                    write_dict(entries, save_path)
 
         entries = [entry for entry in entries if entry['definition']]
 
         flashcards = []
-        N_OPTIONS = 4
         for entry in entries:
             definition = 'Definition: ' + np.random.choice(entry['definition']).split(' - ')[1]
             options = [entry['word']]
@@ -1,12 +1,19 @@
 import argparse
+import json
 import os
-from typing import List, Dict, TextIO
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, TextIO, Iterable, Callable
 
 import numpy as np
 from PyDictionary import PyDictionary
-from rich.progress import track
+from rich.progress import Progress, track
 
 ENTRY_DELIM = '------------------'
+MANIFEST_NAME = 'manifest.json'
+SHARD_NAME = 'shard.{:04d}.txt'
+BUILD_THREADS = 8
+ROUTED_SHARDS = 1
 
 
 def read_words(path: str):
@@ -16,7 +23,7 @@ def read_words(path: str):
     return words
 
 
-def build_dict(words: List[str], progress_bar=False):
+def build_dict(words: List[str], progress_bar=False, advance: Callable[[int], None] = None):
     dictionary = PyDictionary()
 
     words = sorted(set(words))
@@ -25,6 +32,10 @@ def build_dict(words: List[str], progress_bar=False):
     if progress_bar:
         for word in track(words, 'Loading vocab...'):
             entries.append(build_entry(word, dictionary))
+    elif advance:
+        for word in words:
+            entries.append(build_entry(word, dictionary))
+            advance(1)
     else:
         entries = [build_entry(word, dictionary) for word in words]
 
@@ -84,6 +95,11 @@ def build_and_write_dict(args):
     dest_path = args['dest'] if args['dest'] else src_path
 
     words = read_words(src_path)
+    if args.get('shards') or is_sharded_dict(dest_path):
+        build_sharded_dict(words, dest_path, n_shards=args.get('shards'), append=args['append'])
+        print('Done.')
+        return
+
     entries = []
     if args['append']:
         existing_entries = parse_dict(dest_path)
@@ -99,7 +115,10 @@ def build_and_write_dict(args):
     print('Done.')
 
 
-def parse_dict(path: str) -> List[Dict]:
+def parse_dict(path: str, shards: Iterable[int] = None) -> List[Dict]:
+    if is_sharded_dict(path):
+        return parse_sharded_dict(path, shards)
+
     dict_text = ''
     with open(path, 'r') as file:
         dict_text = file.read()
@@ -121,13 +140,215 @@ def parse_entry(text_entry: str) -> Dict:
     return entry
 
 
+def shard_index(word: str, n_shards: int) -> int:
+    return zlib.crc32(word.encode('utf-8')) % n_shards
+
+
+def shard_path(path: str, index: int) -> str:
+    return os.path.join(path, SHARD_NAME.format(index))
+
+
+def partition(items: Iterable, n_shards: int, key=lambda item: item) -> List[List]:
+    shards = [[] for _ in range(n_shards)]
+    for item in items:
+        shards[shard_index(key(item), n_shards)].append(item)
+
+    return shards
+
+
+def is_sharded_dict(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def read_manifest(path: str) -> Dict:
+    with open(os.path.join(path, MANIFEST_NAME), 'r') as file:
+        manifest = json.load(file)
+
+    return manifest
+
+
+def write_manifest(manifest: Dict, path: str):
+    tmp_path = os.path.join(path, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w') as file:
+        json.dump(manifest, file, indent=4)
+
+    os.replace(tmp_path, os.path.join(path, MANIFEST_NAME))
+
+
+def _new_manifest(path: str, n_shards: int) -> Dict:
+    os.makedirs(path, exist_ok=True)
+
+    return {'partition': 'crc32',
+            'shards': [{'file': SHARD_NAME.format(i), 'count': 0} for i in range(n_shards)]}
+
+
+def _write_shard(entries: List[Dict], path: str) -> int:
+    """Write entries next to the shard at path, to be moved into place by _commit_shards"""
+    entries = sorted(entries, key=lambda entry: entry['word'])
+    write_dict(entries, path + '.tmp')
+
+    return len(entries)
+
+
+def _merge_shard(entries: List[Dict], path: str) -> int:
+    words = {entry['word'] for entry in entries}
+    existing_entries = [entry for entry in parse_dict(path) if entry['word'] not in words]
+
+    return _write_shard(entries + existing_entries, path)
+
+
+def _build_shard(words: List[str], path: str, append: bool, advance: Callable[[int], None]) -> int:
+    existing_entries = parse_dict(path) if append else []
+    existing_words = {entry['word'] for entry in existing_entries}
+
+    new_words = list(set(words) - existing_words)
+    advance(len(words) - len(new_words))
+
+    return _write_shard(build_dict(new_words, advance=advance) + existing_entries, path)
+
+
+def _build_shards(word_shards: List[List[str]], paths: List[str], append: bool) -> List[int]:
+    """Build shards in threads, since building is bound by dictionary lookups over the network"""
+    with Progress() as progress, \
+            ThreadPoolExecutor(max_workers=max(1, min(len(paths), BUILD_THREADS))) as executor:
+        task = progress.add_task('Loading vocab...', total=sum(len(words) for words in word_shards))
+
+        def advance(n):
+            progress.advance(task, n)
+
+        futures = [executor.submit(_build_shard, words, path, append, advance)
+                   for words, path in zip(word_shards, paths)]
+
+        return [future.result() for future in futures]
+
+
+def _write_shards(path: str, manifest: Dict, indices: List[int], write_fn: Callable[[], List[int]]):
+    """Write the shards at indices with write_fn, then move them into place and switch over the manifest.
+    The existing dictionary is left untouched if write_fn fails"""
+    old_files = {shard['file'] for shard in read_manifest(path)['shards']} if is_sharded_dict(path) else set()
+    files = [os.path.join(path, manifest['shards'][i]['file']) for i in indices]
+
+    try:
+        counts = write_fn()
+    except BaseException:
+        for file in files:
+            if os.path.isfile(file + '.tmp'):
+                os.remove(file + '.tmp')
+        raise
+
+    for i, file, count in zip(indices, files, counts):
+        os.replace(file + '.tmp', file)
+        manifest['shards'][i]['count'] = count
+
+    write_manifest(manifest, path)
+
+    for file in old_files - {shard['file'] for shard in manifest['shards']}:
+        if os.path.isfile(os.path.join(path, file)):
+            os.remove(os.path.join(path, file))
+
+
+def write_sharded_dict(entries: List[Dict], path: str, n_shards: int):
+    manifest = _new_manifest(path, n_shards)
+    shard_entries = partition(entries, n_shards, key=lambda entry: entry['word'])
+
+    _write_shards(path, manifest, list(range(n_shards)),
+                  lambda: [_write_shard(entries, shard_path(path, i)) for i, entries in enumerate(shard_entries)])
+
+
+def append_sharded_dict(entries: List[Dict], path: str):
+    """Merge entries into an existing sharded dictionary, rewriting only the shards they belong to"""
+    manifest = read_manifest(path)
+    shard_entries = partition(entries, len(manifest['shards']), key=lambda entry: entry['word'])
+    indices = [i for i, shard in enumerate(shard_entries) if shard]
+
+    _write_shards(path, manifest, indices,
+                  lambda: [_merge_shard(shard_entries[i], os.path.join(path, manifest['shards'][i]['file']))
+                           for i in indices])
+
+
+def build_sharded_dict(words: List[str], path: str, n_shards: int = None, append=False):
+    if not n_shards:
+        n_shards = len(read_manifest(path)['shards'])
+    manifest = read_manifest(path) if append else _new_manifest(path, n_shards)
+
+    word_shards = partition(set(words), n_shards)
+    indices = [i for i, shard in enumerate(word_shards) if shard or not append]
+
+    _write_shards(path, manifest, indices,
+                  lambda: _build_shards([word_shards[i] for i in indices],
+                                        [os.path.join(path, manifest['shards'][i]['file']) for i in indices],
+                                        append))
+
+
+def parse_sharded_dict(path: str, shards: Iterable[int] = None) -> List[Dict]:
+    manifest = read_manifest(path)
+    if shards is None:
+        shards = range(len(manifest['shards']))
+
+    return [entry for i in shards for entry in parse_dict(os.path.join(path, manifest['shards'][i]['file']))]
+
+
+def lookup_entries(path: str, words: Iterable[str]) -> List[Dict]:
+    """Find the entries for words in a sharded dictionary, parsing only the shards that can contain them"""
+    words = set(words)
+    word_shards = partition(words, len(read_manifest(path)['shards']))
+    shards = [i for i, shard in enumerate(word_shards) if shard]
+
+    return [entry for entry in parse_sharded_dict(path, shards) if entry['word'] in words]
+
+
+def sample_dict(path: str, n_entries: int, priorities: Dict[str, float] = None,
+                accept: Callable[[Dict], bool] = lambda entry: True,
+                routed_shards: int = ROUTED_SHARDS) -> List[Dict]:
+    """Load entries from part of a sharded dictionary.
+
+    Up to routed_shards shards holding prioritized words are read first, picked by their summed priority. Randomly
+    picked shards, weighted by size, then fill in until at least n_entries accepted entries are loaded or every shard
+    has been read"""
+    manifest = read_manifest(path)
+    n_shards = len(manifest['shards'])
+    counts = np.array([shard['count'] for shard in manifest['shards']], dtype=np.float64)
+
+    shard_priority = np.zeros(n_shards)
+    for word, priority in (priorities or {}).items():
+        shard_priority[shard_index(word, n_shards)] += priority
+    shard_priority[counts == 0] = 0
+
+    routed = np.flatnonzero(shard_priority > 0)
+    if len(routed):
+        routed = np.random.choice(routed, size=min(routed_shards, len(routed)), replace=False,
+                                  p=shard_priority[routed] / shard_priority[routed].sum())
+
+    rest = np.setdiff1d(np.flatnonzero(counts), routed)
+    if len(rest):
+        rest = np.random.choice(rest, size=len(rest), replace=False, p=counts[rest] / counts[rest].sum())
+
+    entries = []
+    for n_loaded, i in enumerate(np.concatenate((routed, rest)).astype(int)):
+        if n_loaded >= len(routed) and len(entries) >= n_entries:
+            break
+
+        shard_entries = parse_dict(os.path.join(path, manifest['shards'][i]['file']))
+        entries.extend(entry for entry in shard_entries if accept(entry))
+
+    return entries
+
+
 def validate_args(args: Dict):
     if not os.path.isfile(args['src']):
         raise ValueError(f'File {args["src"]} does not exist')
     if args['append'] and not args['dest']:
         raise ValueError('Cannot append to non-dict file')
-    if args['append'] and args['dest'] and not os.path.isfile(args['dest']):
+    if args['append'] and args['dest'] and not (os.path.isfile(args['dest']) or is_sharded_dict(args['dest'])):
         raise ValueError(f'Cannot append to non-existing file {args["dest"]}')
+    if args['shards'] is not None and args['shards'] < 1:
+        raise ValueError('SHARDS must be positive')
+    if args['shards'] and not args['dest']:
+        raise ValueError('DEST_PATH is required when writing a sharded dict')
+    if args['shards'] and args['append']:
+        raise ValueError('Cannot change the number of shards when appending')
+    if args['shards'] and os.path.isfile(args['dest']):
+        raise ValueError(f'Cannot write a sharded dict over existing file {args["dest"]}')
 
 
 def get_args():
@@ -152,6 +373,13 @@ def get_args():
                         required=False,
                         help='Append to existing dictionary file at DEST_PATH or overwrite')
 
+    parser.add_argument('--shards',
+                        metavar='N',
+                        type=int,
+                        required=False,
+                        help='Write DEST_PATH as a directory of N dictionary shards plus a manifest. Existing sharded '
+                             'dictionaries are detected automatically')
+
     args = vars(parser.parse_args())
     validate_args(args)
 
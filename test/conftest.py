@@ -0,0 +1,26 @@
+import pytest
+
+
+def make_entry(word, defined=True):
+    return {'word': word,
+            'definition': [f'Noun - the meaning of {word}'] if defined else ['Missing definition'],
+            'synonym': [],
+            'antonym': []}
+
+
+def make_build_dict(words, progress_bar=False, advance=None):
+    entries = [make_entry(word) for word in sorted(set(words))]
+    if advance:
+        advance(len(entries))
+
+    return entries
+
+
+@pytest.fixture
+def fake_entry():
+    return make_entry
+
+
+@pytest.fixture
+def fake_build_dict():
+    return make_build_dict
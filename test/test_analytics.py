@@ -0,0 +1,104 @@
+import pytest
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src/'))
+
+from analytics import EventLog, EVENT_DTYPE, make_events, aggregate, summarize, difficulty_scores, sample_weights
+
+
+class Test_event_log:
+    def test_read_empty(self, tmp_path):
+        events = EventLog(str(tmp_path)).read()
+        assert len(events) == 0
+
+    def test_append_and_read(self, tmp_path):
+        log = EventLog(str(tmp_path))
+        log.append(make_events(['affable', 'pilloried'], [True, False], [1.5, 3.0]))
+        log.record('affable', False, 2.0)
+
+        events = log.read()
+
+        assert len(events) == 3
+        assert list(events['word']) == [b'affable', b'pilloried', b'affable']
+        assert list(events['correct']) == [True, False, False]
+
+    def test_rotation(self, tmp_path):
+        log = EventLog(str(tmp_path), max_segment_bytes=2 * EVENT_DTYPE.itemsize)
+        for i in range(5):
+            log.record('affable', bool(i % 2), float(i))
+
+        assert len(log.segments()) == 3
+        assert list(log.read()['latency']) == [0., 1., 2., 3., 4.]
+
+    def test_summary_updated_on_append(self, tmp_path):
+        log = EventLog(str(tmp_path))
+        log.append(make_events(['affable', 'pilloried'], [True, False], [1., 2.]))
+        log.append(make_events(['pilloried', 'range'], [False, True], [3., 4.]))
+
+        summary = log.summary()
+
+        assert list(summary['word']) == [b'affable', b'pilloried', b'range']
+        assert list(summary['attempts']) == [1, 2, 1]
+        assert list(summary['errors']) == [0, 2, 0]
+
+    def test_summary_rebuilt_from_segments(self, tmp_path):
+        log = EventLog(str(tmp_path))
+        log.append(make_events(['affable', 'pilloried'], [True, False], [1., 2.]))
+        os.remove(os.path.join(str(tmp_path), 'summary.npz'))
+
+        log = EventLog(str(tmp_path))
+        assert list(log.summary()) == list(summarize(log.read()))
+        assert os.path.isfile(os.path.join(str(tmp_path), 'summary.npz'))
+
+    def test_stale_summary_rebuilt(self, tmp_path):
+        log = EventLog(str(tmp_path))
+        log.append(make_events(['affable', 'pilloried'], [True, False], [1., 2.]))
+
+        # Events written without their summary update, as after a crash between the two writes
+        with open(log.segments()[-1], 'ab') as file:
+            make_events(['pilloried'], [False], [3.]).tofile(file)
+
+        summary = EventLog(str(tmp_path)).summary()
+        assert list(summary['attempts']) == [1, 2]
+        assert list(summary['errors']) == [0, 2]
+
+
+class Test_aggregate:
+    def test_error_rate(self):
+        events = make_events(['affable', 'pilloried', 'affable', 'affable'],
+                             [True, False, False, True],
+                             [1., 2., 3., 4.])
+        stats = aggregate(events)
+
+        assert list(stats['word']) == ['affable', 'pilloried']
+        assert list(stats['attempts']) == [3, 1]
+        assert stats['error_rate'] == pytest.approx([1 / 3, 1.])
+
+    def test_percentiles_match_numpy(self):
+        rng = np.random.default_rng(0)
+        words = rng.choice(['affable', 'ensconced', 'pilloried'], size=1000)
+        latencies = rng.exponential(2., size=1000)
+        stats = aggregate(make_events(list(words), rng.random(1000) > 0.3, latencies))
+
+        for i, word in enumerate(stats['word']):
+            word_latencies = latencies[words == word].astype(EVENT_DTYPE['latency']).astype(np.float64)
+            for p in (50, 90, 99):
+                assert stats[f'p{p}'][i] == pytest.approx(np.percentile(word_latencies, p))
+
+    def test_difficulty_ranking_matches_scores(self):
+        events = make_events(['affable', 'pilloried', 'pilloried'], [True, False, True], [1., 2., 3.])
+        stats = aggregate(events, percentiles=())
+
+        assert dict(zip(stats['word'], stats['difficulty'])) == difficulty_scores(summarize(events))
+
+def test_sample_weights():
+    events = make_events(['affable', 'affable', 'pilloried', 'pilloried'],
+                         [True, True, False, False],
+                         [1., 1., 1., 1.])
+    weights = sample_weights(['affable', 'ensconced', 'pilloried'], difficulty_scores(summarize(events)))
+
+    assert weights.sum() == pytest.approx(1.)
+    assert weights[0] < weights[1] < weights[2]
@@ -0,0 +1,108 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../src/'))
+
+from analytics import EventLog, make_events
+from options import MultipleChoice
+from words2dict import write_sharded_dict, parse_dict
+import tools
+from tools import VocabTool
+
+ENTRIES = [{'word': 'affable',
+            'definition': ['Adjective - diffusing warmth and friendliness'],
+            'synonym': ['cordial'],
+            'antonym': ['unfriendly']},
+           {'word': 'pilloried',
+            'definition': ['Verb - expose to ridicule or public scorn'],
+            'synonym': ['exhibit'],
+            'antonym': ['veil']}]
+
+
+def make_flashcards():
+    flashcards = []
+    for entry in ENTRIES:
+        flashcard = MultipleChoice(question=entry['definition'][0], options=[entry['word'], 'ensconced', 'range'])
+        flashcard.entry = entry
+        flashcards.append(flashcard)
+
+    return flashcards
+
+
+def answer_inputs(monkeypatch, answers):
+    answers = iter(answers)
+
+    def fake_input(prompt=''):
+        answer = next(answers)
+        if isinstance(answer, BaseException):
+            raise answer
+        return answer
+
+    monkeypatch.setattr('builtins.input', fake_input)
+
+
+class Test_show_flashcards:
+    def test_records_each_card(self, tmp_path, monkeypatch):
+        tool = VocabTool(log_dir=str(tmp_path))
+        answer_inputs(monkeypatch, ['1', '1'])
+
+        tool._VocabTool__show_flashcards(make_flashcards())
+
+        assert list(EventLog(str(tmp_path)).read()['word']) == [b'affable', b'pilloried']
+
+    def test_records_before_interrupt(self, tmp_path, monkeypatch):
+        tool = VocabTool(log_dir=str(tmp_path))
+        answer_inputs(monkeypatch, ['1', KeyboardInterrupt()])
+
+        with pytest.raises(KeyboardInterrupt):
+            tool._VocabTool__show_flashcards(make_flashcards())
+
+        assert list(EventLog(str(tmp_path)).read()['word']) == [b'affable']
+
+    def test_retry_not_recorded(self, tmp_path, monkeypatch):
+        tool = VocabTool(log_dir=str(tmp_path))
+        answer_inputs(monkeypatch, ['1', '1'])
+
+        tool._VocabTool__show_flashcards(make_flashcards(), record=False)
+
+        assert len(EventLog(str(tmp_path)).read()) == 0
+
+
+class Test_load_flashcards:
+    def test_save_merges_into_sharded_dict(self, tmp_path, monkeypatch, fake_entry, fake_build_dict):
+        monkeypatch.setattr(tools, 'build_dict', fake_build_dict)
+        words_path = os.path.join(str(tmp_path), 'words.txt')
+        with open(words_path, 'w') as file:
+            file.write('\n'.join(['affable', 'ensconced', 'pilloried', 'range']))
+        dict_path = os.path.join(str(tmp_path), 'dict')
+        write_sharded_dict([fake_entry('zealous')], dict_path, n_shards=2)
+
+        tool = VocabTool(log_dir=os.path.join(str(tmp_path), 'log'))
+        answer_inputs(monkeypatch, ['1', dict_path])
+        tool._VocabTool__load_flashcards(words_path, is_dict=False, n_words=4)
+
+        words = sorted(entry['word'] for entry in parse_dict(dict_path))
+        assert words == ['affable', 'ensconced', 'pilloried', 'range', 'zealous']
+
+    def test_sharded_dict_prioritizes_hard_words(self, tmp_path, monkeypatch, fake_entry):
+        dict_path = os.path.join(str(tmp_path), 'dict')
+        write_sharded_dict([fake_entry(f'word{i}') for i in range(200)], dict_path, n_shards=8)
+
+        log_dir = os.path.join(str(tmp_path), 'log')
+        EventLog(log_dir).append(make_events(['word123', 'word7', 'word50'], [False, True, False], [1., 1., 1.]))
+
+        sampled = []
+        sample_dict = tools.sample_dict
+
+        def recording_sample_dict(path, n_entries, priorities=None, accept=None):
+            sampled.append(priorities)
+            return sample_dict(path, n_entries, priorities, accept)
+
+        monkeypatch.setattr(tools, 'sample_dict', recording_sample_dict)
+
+        flashcards = VocabTool(log_dir=log_dir)._VocabTool__load_flashcards(dict_path, is_dict=True, n_words=2)
+
+        assert sorted(sampled[0]) == ['word123', 'word50']
+        assert all(priority > 0 for priority in sampled[0].values())
+        assert len(flashcards) == 2
@@ -6,7 +6,9 @@ from PyDictionary import PyDictionary
 sys.path.append(os.path.join(os.path.dirname(__file__), '../src/'))
 
 from words2dict import parse_dict, parse_entry, read_words, build_dict, build_entry, write_dict, build_and_write_dict, \
-    entry_to_str
+    entry_to_str, write_sharded_dict, append_sharded_dict, build_sharded_dict, lookup_entries, sample_dict, \
+    read_manifest, shard_path, shard_index, validate_args
+import words2dict
 
 TEXT_DIR = os.path.join(os.path.dirname(__file__), 'test_text')
 
@@ -228,3 +230,143 @@ class Test_build_and_write_dict:
             file.write(dict_txt)
 
         assert len(entries_before) == len(entries_after)
+
+
+class Test_sharded_dict:
+    def test_write_and_parse(self, tmp_path):
+        entries = parse_dict(os.path.join(TEXT_DIR, 'dict.txt'))
+        write_sharded_dict(entries, str(tmp_path), n_shards=4)
+
+        manifest = read_manifest(str(tmp_path))
+        sharded_entries = parse_dict(str(tmp_path))
+
+        assert len(manifest['shards']) == 4
+        assert sum(shard['count'] for shard in manifest['shards']) == len(entries)
+        assert sorted(sharded_entries, key=lambda entry: entry['word']) == entries
+
+    def test_lookup(self, tmp_path):
+        entries = parse_dict(os.path.join(TEXT_DIR, 'dict.txt'))
+        write_sharded_dict(entries, str(tmp_path), n_shards=4)
+
+        found = lookup_entries(str(tmp_path), ['pilloried', 'missing'])
+
+        assert found == [entries[-1]]
+
+    def test_append_touches_only_its_shard(self, tmp_path):
+        entries = parse_dict(os.path.join(TEXT_DIR, 'dict.txt'))
+        n_shards = 4
+        write_sharded_dict(entries, str(tmp_path), n_shards=n_shards)
+
+        new_entry = {'word': 'range',
+                     'definition': ['Noun - an area in which something acts or operates'],
+                     'synonym': ['scope'],
+                     'antonym': []}
+        index = shard_index(new_entry['word'], n_shards)
+        others = [i for i in range(n_shards) if i != index]
+        for i in others:
+            os.utime(shard_path(str(tmp_path), i), (0, 0))
+
+        append_sharded_dict([new_entry], str(tmp_path))
+
+        assert all(os.path.getmtime(shard_path(str(tmp_path), i)) == 0 for i in others)
+        assert lookup_entries(str(tmp_path), ['range']) == [new_entry]
+        assert read_manifest(str(tmp_path))['shards'][index]['count'] == \
+            len(parse_dict(shard_path(str(tmp_path), index)))
+
+    def test_sample_dict_filters(self, tmp_path, fake_entry):
+        entries = [fake_entry(f'word{i}', defined=i < 20) for i in range(220)]
+        write_sharded_dict(entries, str(tmp_path), n_shards=8)
+
+        def has_definition(entry):
+            return 'Missing definition' not in entry['definition']
+
+        for _ in range(20):
+            sampled = sample_dict(str(tmp_path), 20, accept=has_definition)
+            assert len(sampled) == 20
+            assert all(has_definition(entry) for entry in sampled)
+
+    def test_sample_dict_routes_priorities(self, tmp_path, fake_entry):
+        entries = [fake_entry(f'word{i}') for i in range(200)]
+        write_sharded_dict(entries, str(tmp_path), n_shards=8)
+
+        for _ in range(20):
+            sampled = sample_dict(str(tmp_path), 1, priorities={'word123': 0.4})
+            assert [entry['word'] for entry in sampled].count('word123') == 1
+
+    def test_sample_dict_parses_few_shards(self, tmp_path, monkeypatch, fake_entry):
+        n_shards = 16
+        entries = [fake_entry(f'word{i}') for i in range(16000)]
+        write_sharded_dict(entries, str(tmp_path), n_shards=n_shards)
+        priorities = {f'word{i * 397}': 0.4 for i in range(40)}
+
+        parsed = []
+
+        def counting_parse_dict(path, shards=None):
+            parsed.append(path)
+            return parse_dict(path, shards)
+
+        monkeypatch.setattr(words2dict, 'parse_dict', counting_parse_dict)
+        sampled = sample_dict(str(tmp_path), 80, priorities=priorities)
+
+        assert len(sampled) >= 80
+        assert len(parsed) == 1
+
+    def test_rewrite_removes_stale_shards(self, tmp_path):
+        entries = parse_dict(os.path.join(TEXT_DIR, 'dict.txt'))
+        write_sharded_dict(entries, str(tmp_path), n_shards=4)
+        write_sharded_dict(entries, str(tmp_path), n_shards=2)
+
+        assert sorted(os.listdir(str(tmp_path))) == ['manifest.json', 'shard.0000.txt', 'shard.0001.txt']
+        assert len(parse_dict(str(tmp_path))) == len(entries)
+
+
+class Test_build_sharded_dict:
+    def test_build(self, tmp_path, monkeypatch, fake_build_dict):
+        monkeypatch.setattr(words2dict, 'build_dict', fake_build_dict)
+        words = [f'word{i}' for i in range(50)]
+
+        build_sharded_dict(words, str(tmp_path), n_shards=4)
+
+        manifest = read_manifest(str(tmp_path))
+        assert len(manifest['shards']) == 4
+        assert sum(shard['count'] for shard in manifest['shards']) == len(words)
+        assert sorted(entry['word'] for entry in parse_dict(str(tmp_path))) == sorted(words)
+
+    def test_failed_rebuild_keeps_dict(self, tmp_path, monkeypatch, fake_build_dict):
+        monkeypatch.setattr(words2dict, 'build_dict', fake_build_dict)
+        build_sharded_dict([f'word{i}' for i in range(50)], str(tmp_path), n_shards=4)
+
+        def failing_build_dict(words, progress_bar=False, advance=None):
+            if 'word7' in words:
+                raise ConnectionError('dictionary unavailable')
+            return fake_build_dict(words, advance=advance)
+
+        monkeypatch.setattr(words2dict, 'build_dict', failing_build_dict)
+        with pytest.raises(ConnectionError):
+            build_sharded_dict([f'word{i}' for i in range(10)], str(tmp_path), n_shards=2)
+
+        assert len(read_manifest(str(tmp_path))['shards']) == 4
+        assert len(parse_dict(str(tmp_path))) == 50
+        assert not [file for file in os.listdir(str(tmp_path)) if file.endswith('.tmp')]
+
+    def test_cli_shards_and_append(self, tmp_path, monkeypatch, fake_build_dict):
+        monkeypatch.setattr(words2dict, 'build_dict', fake_build_dict)
+        dest = os.path.join(str(tmp_path), 'dict')
+
+        build_and_write_dict({'src': os.path.join(TEXT_DIR, 'words.txt'), 'dest': dest, 'append': False, 'shards': 3})
+        assert len(read_manifest(dest)['shards']) == 3
+        assert len(parse_dict(dest)) == len(read_words(os.path.join(TEXT_DIR, 'words.txt')))
+
+        build_and_write_dict({'src': os.path.join(TEXT_DIR, 'words2.txt'), 'dest': dest, 'append': True,
+                              'shards': None})
+        words = set(read_words(os.path.join(TEXT_DIR, 'words.txt')) + read_words(os.path.join(TEXT_DIR, 'words2.txt')))
+        assert sorted(entry['word'] for entry in parse_dict(dest)) == sorted(words)
+
+    def test_validate_shards_over_file(self):
+        args = {'src': os.path.join(TEXT_DIR, 'words.txt'),
+                'dest': os.path.join(TEXT_DIR, 'dict.txt'),
+                'append': False,
+                'shards': 4}
+
+        with pytest.raises(ValueError):
+            validate_args(args)